@@ -1,6 +1,12 @@
+import asyncio
+import functools
+import hashlib
+import shelve
+import orjson
 import requests
 import pandas as pd
 from google import genai
+from google.genai import errors, types
 import seaborn as sns
 
 url = "https://eventregistry.org/api/v1/article/getArticles"
@@ -16,26 +22,96 @@ params = {
 
 response = requests.get(url, params=params)
 
-data = response.json()
+data = orjson.loads(response.content)
 df = pd.DataFrame(data['articles']['results'])
 
 print(df)
 
-client = genai.Client(api_key="APIKEY")
+# O cliente só é criado quando há artigos a classificar (cache miss)
+@functools.lru_cache(maxsize=1)
+def get_client():
+    return genai.Client(api_key="APIKEY")
 
-classifications = []
+# Limite de chamadas simultâneas ao Gemini (respeita o rate limit da API)
+MAX_CONCURRENCY = 20
+# Quantidade de artigos enviados em cada chamada
+BATCH_SIZE = 10
+# Cache em disco das classificações, indexado pelo hash do texto do artigo
+CACHE_PATH = "data/sentiment_cache"
+# Incrementar ao alterar o prompt, para invalidar as entradas antigas do cache
+PROMPT_VERSION = 1
+# Resposta estruturada: o modelo devolve direto um array JSON de scores
+GENERATION_CONFIG = types.GenerateContentConfig(
+    response_mime_type="application/json",
+    response_schema=list[float]
+)
 
-for i in range(len(df)):
-    response = client.models.generate_content(
-        model="gemini-2.5-flash",
-                contents=(
-                    f"""Classifique o sobre bitcoin em positivos, negativos ou neutros.
+def build_prompt(bodies):
+    articles = "\n".join(f"{n}) {body}" for n, body in enumerate(bodies, start=1))
+    return f"""Classifique os {len(bodies)} artigos sobre bitcoin abaixo em positivos, negativos ou neutros.
         Use uma escala de -1 a 1, onde -1 é muito negativo, 0 é neutro e 1 é muito positivo.
-        Retorne APENAS um numero.
-        Aqui está o texto do artigo: {df.iloc[i]['body']}"""
-                )
-    )
-    classifications.append(response.text)
+        Retorne APENAS um array JSON com {len(bodies)} numeros, um por artigo, na mesma ordem.
+        Aqui estão os textos dos artigos:
+{articles}"""
+
+async def classify_batch(bodies, semaphore):
+    async with semaphore:
+        try:
+            response = await get_client().aio.models.generate_content(
+                model="gemini-2.5-flash",
+                contents=build_prompt(bodies),
+                config=GENERATION_CONFIG
+            )
+        except errors.APIError as e:
+            # Um lote com erro (ex.: 429) não derruba os demais; ele fica fora
+            # do cache e é reenviado na próxima execução
+            print(f"Erro da API do Gemini: {e}")
+            return [None] * len(bodies)
+    try:
+        scores = orjson.loads(response.text)
+    except orjson.JSONDecodeError:
+        scores = []
+    # Descarta o lote inteiro se a resposta não tiver um score por artigo
+    if not isinstance(scores, list) or len(scores) != len(bodies):
+        return [None] * len(bodies)
+    return scores
+
+def cache_key(body):
+    return hashlib.sha256(f"{PROMPT_VERSION}|{body}".encode("utf-8")).hexdigest()
+
+async def classify_all(bodies):
+    # Artigos sem texto não são enviados ao Gemini e ficam sem classificação
+    keys = [cache_key(body) if isinstance(body, str) and body.strip() else None for body in bodies]
+    with shelve.open(CACHE_PATH) as cache:
+        # Só envia ao Gemini os artigos que ainda não foram classificados
+        pending = {key: body for key, body in zip(keys, bodies) if key is not None and key not in cache}
+        pending_keys = list(pending)
+        pending_bodies = list(pending.values())
+        empty = keys.count(None)
+        hits = sum(key is not None and key in cache for key in keys)
+        print(f"{empty} artigos sem texto, {hits} encontrados no cache, {len(pending)} textos distintos a classificar.")
+
+        semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+
+        async def classify_and_store(batch_keys, batch_bodies):
+            scores = await classify_batch(batch_bodies, semaphore)
+            # Grava o lote assim que ele termina, para que a falha de outro lote
+            # não descarte o que já foi classificado
+            for key, score in zip(batch_keys, scores):
+                if score is not None:
+                    cache[key] = score
+
+        results = await asyncio.gather(*[
+            classify_and_store(pending_keys[i:i + BATCH_SIZE], pending_bodies[i:i + BATCH_SIZE])
+            for i in range(0, len(pending_bodies), BATCH_SIZE)
+        ], return_exceptions=True)
+        # Erros de conexão/timeout: o lote fica fora do cache e é reenviado na próxima execução
+        for result in results:
+            if isinstance(result, Exception):
+                print(f"Erro ao classificar lote: {result!r}")
+        return [cache.get(key) if key is not None else None for key in keys]
+
+classifications = asyncio.run(classify_all(df['body'].tolist()))
 
 df['sentiment2'] = classifications
 
@@ -76,49 +76,110 @@
 # df_btc_update = fetch_historical_ohlcv('BTC/USDT', '1h', '2025-10-27T00:00:00Z') # Busca dos últimos 2 dias
 # print(df_btc_update)
 
+import asyncio
+from collections import deque
 import ccxt
+import ccxt.async_support as ccxt_async
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from datetime import datetime
 
-# 1. Inicializa conector da binance
-binance = ccxt.binance({
-    'rateLimit': 1200,
-    'enableRateLimit': True
-})
-
-# 2. Função para buscar dados OHLCV históricos
-def fetch_historical_ohlcv(symbol, timeframe, start_date_str):
-    print((f"Buscando OHLCV para {symbol} a cada {timeframe} desde {start_date_str}..."))
-    start_date = binance.parse8601(start_date_str)
-    all_ohlcv = []
+# Limite de páginas buscadas em paralelo
+MAX_CONCURRENCY = 10
+# A Binance limita a 1000 velas por chamada
+PAGE_LIMIT = 1000
 
+# 1. Busca as velas da janela [since, until), repetindo em caso de erro de rede
+async def fetch_page(exchange, symbol, timeframe, since, until):
     while True:
         try:
-            ohlcv = binance.fetch_ohlcv(symbol, timeframe, since=start_date, limit=1000)
-            if len(ohlcv) == 0:
-                break
-            all_ohlcv.extend(ohlcv)
-            start_date = ohlcv[-1][0] + 1
+            page = await exchange.fetch_ohlcv(
+                symbol, timeframe, since=since, limit=PAGE_LIMIT, params={'endTime': until - 1}
+            )
+            # Garante que a página não invade a janela seguinte
+            return [candle for candle in page if since <= candle[0] < until]
         except ccxt.NetworkError as e:
             print(f"Erro de rede: {e}. Tentando novamente...")
-            binance.sleep(5000)
-        except Exception as e:
-            print(f"Erro: {e}")
-            break
+            await asyncio.sleep(5)
+
+# Schema das velas gravadas em Parquet (float32 é suficiente para preços e volume)
+OHLCV_SCHEMA = pa.schema([
+    ('timestamp', pa.timestamp('ms')),
+    ('open', pa.float32()),
+    ('high', pa.float32()),
+    ('low', pa.float32()),
+    ('close', pa.float32()),
+    ('volume', pa.float32()),
+])
+
+def page_to_table(page):
+    # Uma única conversão contígua da página, em vez de transpor a lista de listas
+    candles = np.asarray(page, dtype=np.float64)
+    values = np.ascontiguousarray(candles[:, 1:].T, dtype=np.float32)
+    columns = [pa.array(candles[:, 0].astype(np.int64), type=pa.timestamp('ms'))]
+    columns += [pa.array(column) for column in values]
+    return pa.Table.from_arrays(columns, schema=OHLCV_SCHEMA)
+
+# 2. Divide o período em janelas de PAGE_LIMIT velas, busca até MAX_CONCURRENCY
+# janelas em paralelo e grava cada página no Parquet, em ordem, assim que ela chega
+async def fetch_all_pages(symbol, timeframe, start_date_str, writer):
+    # O throttler do ccxt usa o rateLimit padrão da Binance
+    binance = ccxt_async.binance({
+        'enableRateLimit': True
+    })
+    # Criada antes do try para que o finally sempre consiga limpá-la
+    tasks = deque()
+    try:
+        start_date = binance.parse8601(start_date_str)
+        page_ms = binance.parse_timeframe(timeframe) * 1000 * PAGE_LIMIT
+        since_list = iter(range(start_date, binance.milliseconds(), page_ms))
+
+        def schedule_next():
+            since = next(since_list, None)
+            if since is not None:
+                tasks.append((since, asyncio.create_task(
+                    fetch_page(binance, symbol, timeframe, since, since + page_ms)
+                )))
+
+        # Só MAX_CONCURRENCY janelas ficam pendentes: páginas prontas não se acumulam
+        # na memória enquanto a primeira da fila ainda está sendo buscada
+        for _ in range(MAX_CONCURRENCY):
+            schedule_next()
+        while tasks:
+            since, task = tasks.popleft()
+            try:
+                page = await task
+            except Exception as e:
+                # Interrompe a busca para não deixar buracos na série: o arquivo
+                # fica só com as velas anteriores a esta janela
+                print(f"Erro: {e}. Busca interrompida em {binance.iso8601(since)}.")
+                break
+            if len(page) > 0:
+                writer.write_table(page_to_table(page))
+            schedule_next()
+    finally:
+        for _, task in tasks:
+            task.cancel()
+        await asyncio.gather(*(task for _, task in tasks), return_exceptions=True)
+        await binance.close()
+
+# 3. Função para buscar dados OHLCV históricos e salvá-los em Parquet
+def fetch_historical_ohlcv(symbol, timeframe, start_date_str, output_path=None):
+    print((f"Buscando OHLCV para {symbol} a cada {timeframe} desde {start_date_str}..."))
+    if output_path is None:
+        output_path = f"data/{symbol.replace('/', '')}_{timeframe}.parquet"
 
-    if(len(all_ohlcv) == 0):
-        return pd.DataFrame(columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-    
-    df = pd.DataFrame(all_ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+    with pq.ParquetWriter(output_path, OHLCV_SCHEMA, compression='zstd') as writer:
+        asyncio.run(fetch_all_pages(symbol, timeframe, start_date_str, writer))
 
-    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-    df.set_index('timestamp', inplace=True)
-    df = df.astype(float)
-    df = df[~df.index.duplicated(keep='first')]
-    print(f"Busca concluída. Total de {len(df)} velas.")
+    df = pd.read_parquet(output_path).set_index('timestamp')
+    # Cada página é limitada à sua janela [since, until) e gravada em ordem,
+    # então o índice é crescente e sem duplicados
+    assert df.index.is_monotonic_increasing and df.index.is_unique
+    print(f"Busca concluída. Total de {len(df)} velas salvas em {output_path}.")
     return df
 
 df = fetch_historical_ohlcv('BTC/USDT', '1d', '2024-01-01T00:00:00Z')
 print(df)
-    
-        
\ No newline at end of file